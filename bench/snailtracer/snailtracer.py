@@ -1,7 +1,18 @@
+import argparse
+import binascii
+import collections
+import contextlib
 import cProfile
+import functools
+import itertools
+import json
+import mmap
+import os
 import pathlib
 import pstats
-from typing import Final
+import sys
+import time
+from typing import Callable, Final, Iterator
 
 import pyrevm
 
@@ -10,15 +21,116 @@ CONTRACT_DATA_FILE_PATH: Final[pathlib.Path] = (
 )
 ZERO_ADDRESS: Final[str] = "0x0000000000000000000000000000000000000000"
 CALLER_ADDRESS: Final[str] = "0x1000000000000000000000000000000000000001"
+NOOP_ADDRESS: Final[str] = "0x2000000000000000000000000000000000000002"
+# PUSH0 PUSH0 POP POP, does no real work so a call to it is pure per-call overhead
+NOOP_CODE: Final[bytes] = bytes.fromhex("5F5F5050")
+# emit one JSON object per measurement instead of human-readable lines
+BENCH_JSON: Final[bool] = os.environ.get("BENCH_JSON") == "1"
+# EVM configurations compared by `_benchmark_interleaved`, spelled the way revm names them
+SPEC_IDS: Final[tuple[str, ...]] = ("Shanghai", "Cancun")
+# BLOBBASEFEE, which only runs from Cancun on
+BLOBBASEFEE_CODE: Final[bytes] = bytes.fromhex("4A")
+# the spec ids that may run BLOBBASEFEE, any other name that does fell through to LATEST
+CANCUN_OR_LATER_SPEC_IDS: Final[tuple[str, ...]] = ("Cancun", "Prague", "LATEST")
+
+
+def _report(msg: str, n: int, total_time: float, json_out: bool = BENCH_JSON) -> None:
+    per_time = total_time / n * 1e6
+    if json_out:
+        print(
+            json.dumps({"name": msg, "n": n, "total_s": total_time, "per_us": per_time})
+        )
+    else:
+        print(f"{msg}: {n} runs in {total_time:.3f} s, {per_time:.3f} us per call")
+
+
+@contextlib.contextmanager
+def timeit(msg: str, n: int, json_out: bool = BENCH_JSON) -> Iterator[None]:
+    # the clock is only sampled around the whole block, never per iteration
+    start = time.perf_counter()
+    yield
+    _report(msg, n, time.perf_counter() - start, json_out)
+
+
+def _pin_to_core() -> None:
+    # cross-core migration and frequency scaling are noisier than the per-call cost we measure
+    if not hasattr(os, "sched_setaffinity"):
+        return
+
+    core = int(os.environ.get("BENCH_CORE", max(os.sched_getaffinity(0))))
+    os.sched_setaffinity(0, {core})
+
+    governor_path = pathlib.Path(
+        f"/sys/devices/system/cpu/cpu{core}/cpufreq/scaling_governor"
+    )
+    try:
+        governor = governor_path.read_text().strip()
+    except OSError:
+        return
+    if governor != "performance":
+        print(
+            f"warning: cpu{core} uses the {governor!r} governor, results may be noisy",
+            file=sys.stderr,
+        )
+
+
+def warmup_until_steady(
+    bench: Callable[[int], int],
+    batch: int = 2,
+    tol: float = 0.01,
+    max_batches: int = 50,
+) -> int:
+    """
+    Runs `bench` in batches until the mean time per run of two consecutive batches
+    differs by less than `tol`, and returns the number of warmup runs it took.
+    :param bench: Runs the benchmark `n` times and returns the elapsed nanoseconds.
+    """
+    previous_mean = None
+    for i in range(1, max_batches + 1):
+        mean = bench(batch) / batch
+        if previous_mean is not None and abs(mean - previous_mean) / mean < tol:
+            return i * batch
+        previous_mean = mean
+    return max_batches * batch
 
 
 def _load_contract_data(data_file_path: pathlib.Path) -> bytes:
-    with open(data_file_path, mode="r") as file:
-        return bytes.fromhex(file.read())
+    # decode straight from the mapped file, without reading it into a str first
+    with open(data_file_path, mode="rb") as file:
+        # an empty file cannot be mapped
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as contents, memoryview(contents) as view:
+            # a2b_hex rejects the surrounding whitespace bytes.fromhex would skip
+            start, end = 0, len(contents)
+            while start < end and contents[start] in b" \t\n\r\x0b\x0c":
+                start += 1
+            while end > start and contents[end - 1] in b" \t\n\r\x0b\x0c":
+                end -= 1
+            return binascii.a2b_hex(view[start:end])
+
+
+def _check_spec_id(spec_id: str) -> None:
+    # revm silently runs names it does not know as LATEST, e.g. "SHANGHAI" for "Shanghai"
+    if spec_id in CANCUN_OR_LATER_SPEC_IDS:
+        return
+    probe = pyrevm.EVM(spec_id=spec_id)
+    probe.insert_account_info(ZERO_ADDRESS, pyrevm.AccountInfo(code=BLOBBASEFEE_CODE))
+    try:
+        probe.message_call(caller=CALLER_ADDRESS, to=ZERO_ADDRESS)
+    except RuntimeError:
+        # not activated, so the spec is a real one from before Cancun
+        return
+    raise ValueError(f"unknown spec id {spec_id!r}, revm would run it as LATEST")
 
 
-def _construct_evm(contract_address: str, contract_data: bytes) -> pyrevm.EVM:
-    evm = pyrevm.EVM()
+def _construct_evm(
+    contract_address: str, contract_data: bytes, spec_id: str = "LATEST"
+) -> pyrevm.EVM:
+    _check_spec_id(spec_id)
+    evm = pyrevm.EVM(spec_id=spec_id)
     evm.insert_account_info(
         contract_address,
         pyrevm.AccountInfo(code=contract_data),
@@ -30,30 +142,131 @@ def _benchmark(
     evm: pyrevm.EVM,
     caller_address: str,
     contract_address: str,
-    call_data: list[int],
+    call_data: bytes,
     num_runs: int = 10,
-    warmup_runs: int = 2,
+    warmup_batch: int = 2,
+    deep_profile: bool = False,
 ) -> None:
-    def bench() -> None:
-        evm.message_call(
+    # bind the method and its arguments once; the runs themselves loop on the Rust side
+    bench = functools.partial(
+        evm.message_call_many,
+        caller=caller_address,
+        to=contract_address,
+        calldata=call_data,
+    )
+
+    warmup_runs = warmup_until_steady(bench, warmup_batch)
+    print(f"steady after {warmup_runs} warmup runs", file=sys.stderr)
+
+    call = functools.partial(
+        evm.message_call,
+        caller=caller_address,
+        to=contract_address,
+        calldata=call_data,
+    )
+
+    # in JSON mode stdout only carries the measurements, one object per line
+    profile_out = sys.stderr if BENCH_JSON else sys.stdout
+
+    # profile a python-driven loop: the rust loop is a single FFI call, so a profiler
+    # would only attribute all of its time to `message_call_many`
+    if deep_profile:
+        # cProfile traces every Python call and return, which inflates the per-call cost
+        pr = cProfile.Profile()
+        pr.enable()
+        for _ in range(num_runs):
+            call()
+        pr.disable()
+
+        # report outside the profiled region, so the stats do not include their own I/O
+        pstats.Stats(pr, stream=profile_out).sort_stats(
+            pstats.SortKey.CUMULATIVE
+        ).print_stats(10)
+    else:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            raise SystemExit(
+                "pyinstrument is not installed: `pip install pyinstrument` or pass --deep-profile"
+            )
+
+        profiler = Profiler(interval=0.001)
+        profiler.start()
+        for _ in range(num_runs):
+            call()
+        profiler.stop()
+
+        print(profiler.output_text(unicode=True), file=profile_out)
+
+    # compare the python-driven loop against the total the rust side accumulates,
+    # the difference is the per-call cost of crossing the FFI boundary
+    with timeit("python loop", num_runs):
+        # drive the loop from C: starmap calls `call()` and the empty deque discards the results
+        collections.deque(
+            itertools.starmap(call, itertools.repeat((), num_runs)), maxlen=0
+        )
+
+    _report("rust loop", num_runs, bench(num_runs) / 1e9)
+
+
+def _benchmark_overhead(
+    evm: pyrevm.EVM,
+    caller_address: str,
+    contract_address: str,
+    num_runs: int = 100_000,
+    warmup_batch: int = 1_000,
+) -> None:
+    bench = functools.partial(
+        evm.message_call_many, caller=caller_address, to=contract_address
+    )
+    warmup_runs = warmup_until_steady(bench, warmup_batch)
+    print(f"overhead: steady after {warmup_runs} warmup runs", file=sys.stderr)
+    _report("noop call overhead", num_runs, bench(num_runs) / 1e9)
+
+
+def _benchmark_interleaved(
+    evms: dict[str, pyrevm.EVM],
+    caller_address: str,
+    contract_address: str,
+    call_data: bytes,
+    num_runs: int = 10,
+    warmup_batch: int = 2,
+) -> None:
+    # one call per configuration in every round, so frequency and thermal drift
+    # affect all of them equally instead of whichever batch happened to run last
+    benches = {
+        name: functools.partial(
+            evm.message_call_many,
             caller=caller_address,
             to=contract_address,
-            data=call_data,
+            calldata=call_data,
         )
+        for name, evm in evms.items()
+    }
+    for name, bench in benches.items():
+        warmup_runs = warmup_until_steady(bench, warmup_batch)
+        print(f"{name}: steady after {warmup_runs} warmup runs", file=sys.stderr)
 
-    for _ in range(warmup_runs):
-        bench()
+    elapsed_ns = dict.fromkeys(benches, 0)
+    for _ in itertools.repeat(None, num_runs):
+        for name, bench in benches.items():
+            elapsed_ns[name] += bench(1)
 
-    with cProfile.Profile() as pr:
-        for _ in range(num_runs):
-            bench()
-
-        pr.disable()
-        p = pstats.Stats(pr)
-        p.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(10)
+    for name, total_ns in elapsed_ns.items():
+        _report(f"interleaved {name}", num_runs, total_ns / 1e9)
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--deep-profile",
+        action="store_true",
+        help="profile with cProfile instead of the pyinstrument sampling profiler",
+    )
+    args = parser.parse_args()
+
+    _pin_to_core()
+
     contract_data = _load_contract_data(CONTRACT_DATA_FILE_PATH)
     evm = _construct_evm(ZERO_ADDRESS, contract_data)
 
@@ -61,9 +274,28 @@ def main() -> None:
         evm,
         caller_address=CALLER_ADDRESS,
         contract_address=ZERO_ADDRESS,
-        call_data=list(bytes.fromhex("30627b7c")),
+        call_data=bytes.fromhex("30627b7c"),
+        num_runs=10,
+        warmup_batch=2,
+        deep_profile=args.deep_profile,
+    )
+
+    _benchmark_overhead(
+        _construct_evm(NOOP_ADDRESS, NOOP_CODE),
+        caller_address=CALLER_ADDRESS,
+        contract_address=NOOP_ADDRESS,
+    )
+
+    _benchmark_interleaved(
+        {
+            spec_id: _construct_evm(ZERO_ADDRESS, contract_data, spec_id)
+            for spec_id in SPEC_IDS
+        },
+        caller_address=CALLER_ADDRESS,
+        contract_address=ZERO_ADDRESS,
+        call_data=bytes.fromhex("30627b7c"),
         num_runs=10,
-        warmup_runs=2,
+        warmup_batch=2,
     )
 
 
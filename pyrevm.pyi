@@ -1,4 +1,4 @@
-from typing import Optional, Type
+from typing import Optional, Type, Union
 
 
 class CfgEnv:
@@ -51,7 +51,7 @@ class TxEnv:
         gas_priority_fee: Optional[int] = None,
         to: Optional[str] = None,
         value: Optional[int] = None,
-        data: Optional[bytes] = None,
+        data: Optional[Union[bytes, bytearray, memoryview]] = None,
         chain_id: Optional[int] = None,
         nonce: Optional[int] = None,
         salt: Optional[int] = None,
@@ -118,7 +118,7 @@ class AccountInfo:
         cls: Type["AccountInfo"],
         nonce: int = 0,
         code_hash: Optional[bytes] = None,
-        code: Optional[bytes] = None,
+        code: Optional[Union[bytes, bytearray, memoryview]] = None,
     ) -> "AccountInfo": ...
 
     @property
@@ -187,6 +187,13 @@ class EVM:
         :return: The account info.
         """
 
+    def preload(self: "EVM", addresses: list[str]) -> None:
+        """
+        Fetches the basic account info of the given addresses from the fork concurrently,
+        so that later lookups are served from the cache. Does nothing without a fork.
+        :param addresses: The addresses of the accounts.
+        """
+
     def get_code(self: "EVM", address: str) -> Optional[bytes]:
         """
         Returns the code of the given address.
@@ -205,7 +212,7 @@ class EVM:
         self: "EVM",
         caller: str,
         to: str,
-        calldata: Optional[bytes] = None,
+        calldata: Optional[Union[bytes, bytearray, memoryview]] = None,
         value: Optional[int] = None,
         gas: Optional[int] = None,
         gas_price: Optional[int] = None,
@@ -213,6 +220,8 @@ class EVM:
     ) -> bytes:
         """
         Processes a raw call, without committing the result to the state.
+        The GIL is released while the call runs, so use one EVM per thread:
+        calling an EVM that is still busy in another thread raises a RuntimeError.
         :param caller: The address of the caller.
         :param to: The address of the callee.
         :param calldata: The calldata.
@@ -223,10 +232,36 @@ class EVM:
         :return: The return data and a list of changes to the state.
         """
 
+    def message_call_many(
+        self: "EVM",
+        n: int,
+        caller: str,
+        to: str,
+        calldata: Optional[Union[bytes, bytearray, memoryview]] = None,
+        value: Optional[int] = None,
+        gas: Optional[int] = None,
+        gas_price: Optional[int] = None,
+        is_static = False,
+    ) -> int:
+        """
+        Processes the same raw call `n` times, without committing the result to the state.
+        The GIL is released while the calls run, so use one EVM per thread:
+        calling an EVM that is still busy in another thread raises a RuntimeError.
+        :param n: The number of times to run the call.
+        :param caller: The address of the caller.
+        :param to: The address of the callee.
+        :param calldata: The calldata.
+        :param value: The value to be transferred.
+        :param gas: The gas supplied for each call.
+        :param gas_price: The gas price for each call. Defaults to 0.
+        :param is_static: Whether the call is static (i.e. does not change the state).
+        :return: The total elapsed time in nanoseconds.
+        """
+
     def deploy(
         self: "EVM",
         deployer: str,
-        code: bytes,
+        code: Union[bytes, bytearray, memoryview],
         value: Optional[int] = None,
         gas: Optional[int] = None,
         is_static = False,
@@ -234,6 +269,8 @@ class EVM:
     ) -> str:
         """
         Deploys the given code.
+        The GIL is released while the deployment runs, so use one EVM per thread:
+        calling an EVM that is still busy in another thread raises a RuntimeError.
         :param deployer: The address of the deployer.
         :param code: The code.
         :param value: The value.
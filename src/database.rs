@@ -2,6 +2,7 @@ use crate::empty_db_wrapper::EmptyDBWrapper;
 use crate::utils::pyerr;
 use ethers_core::types::BlockId;
 use ethers_providers::{Http, Provider};
+use pyo3::exceptions::PyRuntimeError;
 use pyo3::{PyErr, PyResult};
 use revm::db::{CacheDB, DbAccount, EthersDB};
 use revm::precompile::{Address, B256};
@@ -12,6 +13,9 @@ use ruint::aliases::U256;
 use std::str::FromStr;
 use std::sync::Arc;
 
+/// The most accounts `DB::preload_accounts` fetches at the same time.
+const MAX_CONCURRENT_PRELOADS: usize = 8;
+
 type MemDB = CacheDB<EmptyDBWrapper>;
 type ForkDB = CacheDB<EthersDB<Provider<Http>>>;
 
@@ -47,6 +51,56 @@ impl DB {
         }
     }
 
+    /// Fetch the given accounts from the remote node concurrently and cache them, so that later
+    /// lookups don't pay one round trip each. Accounts that are already cached are skipped, and
+    /// in-memory databases have nothing to fetch.
+    pub(crate) fn preload_accounts(&mut self, addresses: &[Address]) -> PyResult<()> {
+        let DB::Fork(db) = self else {
+            return Ok(());
+        };
+        let missing: Vec<Address> = addresses
+            .iter()
+            .filter(|address| !db.accounts.contains_key(*address))
+            .copied()
+            .collect();
+
+        // each lookup blocks its thread on its own request, so fetch in bounded batches rather
+        // than one thread per address
+        let remote = &db.db;
+        let mut fetched = Vec::with_capacity(missing.len());
+        for batch in missing.chunks(MAX_CONCURRENT_PRELOADS) {
+            let batch_fetched = std::thread::scope(|scope| {
+                let handles: Vec<_> = batch
+                    .iter()
+                    .map(|&address| {
+                        scope.spawn(move || remote.basic_ref(address).map(|info| (address, info)))
+                    })
+                    .collect();
+                // join every thread before propagating an error, otherwise the scope re-panics
+                // for any unjoined thread that panicked
+                let joined: Vec<_> = handles.into_iter().map(|handle| handle.join()).collect();
+                joined
+                    .into_iter()
+                    .map(|fetch| match fetch {
+                        Ok(fetch) => fetch.map_err(pyerr),
+                        Err(_) => Err(PyRuntimeError::new_err("account preload panicked")),
+                    })
+                    .collect::<PyResult<Vec<_>>>()
+            })?;
+            fetched.extend(batch_fetched);
+        }
+
+        for (address, info) in fetched {
+            match info {
+                Some(info) => db.insert_account_info(address, info),
+                None => {
+                    db.accounts.insert(address, DbAccount::new_not_existing());
+                }
+            }
+        }
+        Ok(())
+    }
+
     pub(crate) fn get_accounts(&self) -> &HashMap<Address, DbAccount> {
         match self {
             DB::Memory(db) => &db.accounts,
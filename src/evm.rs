@@ -1,10 +1,11 @@
 use std::collections::{HashMap, HashSet};
 use std::fmt::Debug;
 use std::mem::replace;
+use std::time::Instant;
 
 use pyo3::exceptions::{PyKeyError, PyOverflowError};
 use pyo3::types::PyBytes;
-use pyo3::{pyclass, pymethods, PyObject, PyResult, Python};
+use pyo3::{pyclass, pymethods, PyAny, PyObject, PyResult, Python};
 use revm::precompile::{Address, Bytes};
 use revm::primitives::ExecutionResult::Success;
 use revm::primitives::{
@@ -16,10 +17,10 @@ use tracing::trace;
 
 use crate::database::DB;
 use crate::executor::call_evm;
-use crate::types::{PyByteVec, PyDB};
+use crate::types::PyDB;
 use crate::{
     types::{AccountInfo, BlockEnv, Env, ExecutionResult, JournalCheckpoint, TxEnv},
-    utils::{addr, pyerr},
+    utils::{addr, extract_bytes, pyerr},
 };
 
 #[derive(Debug)]
@@ -116,6 +117,15 @@ impl EVM {
         Ok(account.info.clone().into())
     }
 
+    /// Fetch the given accounts from the fork concurrently, so later lookups are served from cache.
+    fn preload(&mut self, addresses: Vec<&str>, py: Python<'_>) -> PyResult<()> {
+        let addresses = addresses
+            .into_iter()
+            .map(addr)
+            .collect::<PyResult<Vec<Address>>>()?;
+        py.allow_threads(|| self.context.db.preload_accounts(&addresses))
+    }
+
     fn get_code(&mut self, address: &str, py: Python<'_>) -> PyResult<Option<PyObject>> {
         let (code, _) = self.context.code(addr(address)?).map_err(pyerr)?;
         if code.is_empty() {
@@ -171,7 +181,7 @@ impl EVM {
         &mut self,
         caller: &str,
         to: &str,
-        calldata: Option<PyByteVec>,
+        calldata: Option<&PyAny>,
         value: Option<U256>,
         gas: Option<U256>,
         gas_price: Option<U256>,
@@ -181,38 +191,71 @@ impl EVM {
         let env = self.build_test_env(
             addr(caller)?,
             TransactTo::Call(addr(to)?),
-            calldata.unwrap_or_default().into(),
+            calldata.map(extract_bytes).transpose()?.unwrap_or_default(),
             value.unwrap_or_default(),
             gas,
             gas_price,
         );
-        match self.call_with_env(env, is_static) {
+        match py.allow_threads(|| self.call_with_env(env, is_static)) {
             Ok(data) => Ok(PyBytes::new(py, data.as_ref()).into()),
             Err(e) => Err(e),
         }
     }
 
+    /// Run the same message call `n` times in a single call from Python, without committing
+    /// the result to the state. Returns the total elapsed time in nanoseconds.
+    #[pyo3(signature = (n, caller, to, calldata = None, value = None, gas = None, gas_price = None, is_static = false))]
+    fn message_call_many(
+        &mut self,
+        n: usize,
+        caller: &str,
+        to: &str,
+        calldata: Option<&PyAny>,
+        value: Option<U256>,
+        gas: Option<U256>,
+        gas_price: Option<U256>,
+        is_static: bool,
+        py: Python<'_>,
+    ) -> PyResult<u128> {
+        let env = self.build_test_env(
+            addr(caller)?,
+            TransactTo::Call(addr(to)?),
+            calldata.map(extract_bytes).transpose()?.unwrap_or_default(),
+            value.unwrap_or_default(),
+            gas,
+            gas_price,
+        );
+        py.allow_threads(|| {
+            let start = Instant::now();
+            for _ in 0..n {
+                self.call_with_env(env.clone(), is_static)?;
+            }
+            Ok(start.elapsed().as_nanos())
+        })
+    }
+
     /// Deploy a contract with the given code.
     #[pyo3(signature = (deployer, code, value = None, gas = None, gas_price = None, is_static = false, _abi = None))]
     fn deploy(
         &mut self,
         deployer: &str,
-        code: PyByteVec,
+        code: &PyAny,
         value: Option<U256>,
         gas: Option<U256>,
         gas_price: Option<U256>,
         is_static: bool,
         _abi: Option<&str>,
+        py: Python<'_>,
     ) -> PyResult<String> {
         let env = self.build_test_env(
             addr(deployer)?,
             TransactTo::Create(CreateScheme::Create),
-            code.into(),
+            extract_bytes(code)?,
             value.unwrap_or_default(),
             gas,
             gas_price,
         );
-        match self.deploy_with_env(env, is_static) {
+        match py.allow_threads(|| self.deploy_with_env(env, is_static)) {
             Ok((_, address)) => Ok(format!("{:?}", address)),
             Err(e) => Err(e),
         }
@@ -364,6 +407,8 @@ impl EVM {
         }
     }
 
+    /// Runs the EVM with the given `env`. This does not touch any Python objects, so callers
+    /// can run it with the GIL released; the tracer re-acquires the GIL when it writes output.
     fn run_env(&mut self, env: RevmEnv, is_static: bool) -> PyResult<RevmExecutionResult> {
         self.context.env = Box::new(env);
         let evm_context: EvmContext<DB> =
@@ -1,13 +1,13 @@
 use std::default::Default;
 
 use pyo3::types::PyTuple;
-use pyo3::{pyclass, pymethods, types::PyBytes, PyObject, PyResult, Python};
+use pyo3::{pyclass, pymethods, types::PyBytes, PyAny, PyObject, PyResult, Python};
 use revm::primitives::{
     Address, BlobExcessGasAndPrice, BlockEnv as RevmBlockEnv, CfgEnv as RevmCfgEnv, CreateScheme,
     Env as RevmEnv, TransactTo, TxEnv as RevmTxEnv, B256, U256,
 };
 
-use crate::utils::{addr, addr_or_zero, from_pybytes};
+use crate::utils::{addr, addr_or_zero, extract_bytes, from_pybytes};
 
 #[pyclass]
 #[derive(Clone, Debug, Default)]
@@ -70,7 +70,7 @@ impl TxEnv {
         gas_priority_fee: Option<U256>,
         to: Option<&str>,
         value: Option<U256>,
-        data: Option<Vec<u8>>,
+        data: Option<&PyAny>,
         chain_id: Option<u64>,
         nonce: Option<u64>,
         salt: Option<U256>,
@@ -90,7 +90,7 @@ impl TxEnv {
                     .unwrap_or_else(TransactTo::create),
             },
             value: value.unwrap_or_default(),
-            data: data.unwrap_or_default().into(),
+            data: data.map(extract_bytes).transpose()?.unwrap_or_default(),
             chain_id,
             nonce,
             access_list: access_list
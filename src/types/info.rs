@@ -1,6 +1,8 @@
 use pyo3::{prelude::*, types::PyBytes};
 use revm::primitives::{AccountInfo as RevmAccountInfo, Bytecode, KECCAK_EMPTY, U256};
 
+use crate::utils::extract_bytes;
+
 #[pyclass]
 #[derive(Debug, Default, Clone)]
 pub struct AccountInfo(RevmAccountInfo);
@@ -36,9 +38,9 @@ impl AccountInfo {
         balance: Option<U256>,
         nonce: u64,
         code_hash: Option<&PyBytes>,
-        code: Option<&PyBytes>,
+        code: Option<&PyAny>,
     ) -> PyResult<Self> {
-        let code = code.map(|bytes| Bytecode::new_raw(bytes.as_bytes().to_vec().into()));
+        let code = code.map(extract_bytes).transpose()?.map(Bytecode::new_raw);
         let code_hash = code_hash
             .and_then(|hash| hash.as_bytes().try_into().ok())
             .or_else(|| code.as_ref().map(|code| code.hash_slow()))
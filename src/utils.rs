@@ -1,7 +1,8 @@
-use pyo3::exceptions::PyRuntimeError;
+use pyo3::buffer::PyBuffer;
+use pyo3::exceptions::{PyDeprecationWarning, PyRuntimeError};
 use pyo3::types::PyBytes;
 use pyo3::{exceptions::PyTypeError, prelude::*};
-use revm::precompile::B256;
+use revm::precompile::{Bytes, B256};
 use revm::primitives::{fake_exponential as revm_fake_exponential, Address};
 use std::fmt;
 
@@ -26,6 +27,28 @@ pub(crate) fn from_pybytes(b: &PyBytes) -> PyResult<B256> {
     B256::try_from(b.as_bytes()).map_err(|e| PyTypeError::new_err(e.to_string()))
 }
 
+/// Extract a byte string from a Python object. `bytes` and other objects supporting the buffer
+/// protocol (`bytearray`, `memoryview`) are copied in one go, other sequences of ints are still
+/// accepted but converted element by element, so they are deprecated.
+pub(crate) fn extract_bytes(obj: &PyAny) -> PyResult<Bytes> {
+    if let Ok(bytes) = obj.downcast::<PyBytes>() {
+        return Ok(bytes.as_bytes().to_vec().into());
+    }
+    let py = obj.py();
+    if let Ok(buffer) = PyBuffer::<u8>::get(obj) {
+        return Ok(buffer.to_vec(py)?.into());
+    }
+    // only warn once we know the value converts, wrong types should just raise a TypeError
+    let bytes = obj.extract::<Vec<u8>>()?;
+    PyErr::warn(
+        py,
+        py.get_type::<PyDeprecationWarning>(),
+        "passing a sequence of ints as bytes is deprecated, pass `bytes` instead",
+        1,
+    )?;
+    Ok(bytes.into())
+}
+
 #[pyfunction]
 pub fn fake_exponential(factor: u64, numerator: u64, denominator: u64) -> u128 {
     revm_fake_exponential(factor, numerator, denominator)
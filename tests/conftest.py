@@ -0,0 +1,75 @@
+import os
+import time
+
+import pytest
+
+from pyrevm import EVM
+from tests.utils import FIXTURES_DIR, write_raw_fixture
+
+# minimum spacing between two tests hitting the same fork url, to stay below provider rate limits
+FORK_REQUEST_INTERVAL = 0.2
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "fork: the test talks to a remote node through `fork_url`"
+    )
+
+
+def pytest_sessionstart(session):
+    # decode the hex fixtures up front, so tests only read raw bytes
+    for name in os.listdir(FIXTURES_DIR):
+        if name.endswith(".bin"):
+            try:
+                write_raw_fixture(name)
+            except OSError:
+                # e.g. a read-only checkout, load_contract_bin decodes the hex instead
+                pass
+
+
+def pytest_collection_modifyitems(config, items):
+    # without a node of our own, fork tests would hit a shared public endpoint
+    if os.getenv("FORK_URL"):
+        return
+    skip_fork = pytest.mark.skip(reason="FORK_URL is not set")
+    for item in items:
+        if item.get_closest_marker("fork") is not None:
+            item.add_marker(skip_fork)
+
+
+@pytest.fixture(scope="session")
+def forked_evm():
+    # the fork client and its account cache are shared, so state-changing tests
+    # must snapshot() and revert() around their body
+    return EVM(fork_url=os.getenv("FORK_URL"), fork_block="latest")
+
+
+class RateLimiter:
+    """Spaces out calls that share a key by at least `interval` seconds."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.last_call: dict[str, float] = {}
+
+    def wait(self, key: str) -> None:
+        last = self.last_call.get(key)
+        if last is not None:
+            remaining = self.interval - (time.monotonic() - last)
+            if remaining > 0:
+                time.sleep(remaining)
+        self.last_call[key] = time.monotonic()
+
+
+fork_rate_limiter = RateLimiter(FORK_REQUEST_INTERVAL)
+
+
+@pytest.fixture(autouse=True)
+def rate_limit_fork_tests(request):
+    # only tests marked as `fork` are throttled, everything else runs back to back
+    if request.node.get_closest_marker("fork") is not None:
+        kwargs = getattr(request.node, "callspec", None)
+        kwargs = kwargs.params.get("kwargs", {}) if kwargs else {}
+        fork_rate_limiter.wait(
+            kwargs.get("fork_url") or getattr(request.module, "fork_url", "")
+        )
+    yield
@@ -1,27 +1,83 @@
 import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from pyrevm import EVM, AccountInfo, BlockEnv, Env, TxEnv
 
 import pytest
-from tests.utils import encode_address, encode_uint, load_contract_bin
+from tests.utils import encode_address, encode_calldata, load_contract_bin
 
 address = "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045"  # vitalik.eth
 address2 = "0xbBbBBBBbbBBBbbbBbbBbbbbBBbBbbbbBbBbbBBbB"
 
-# use your own key during development to avoid rate limiting the CI job
-fork_url = (
-    os.getenv("FORK_URL")
-    or "https://mainnet.infura.io/v3/c60b0bb42f8a4c6481ecd229eddaca27"
-)
+# tests marked with `fork` are skipped unless FORK_URL points to a node, see conftest.py
+fork_url = os.getenv("FORK_URL")
 
-KWARG_CASES = [
-    {"fork_url": fork_url},
-    {"fork_url": fork_url, "tracing": False, "fork_block": "latest"},
+# tests that don't consume traces run without a tracer, the `{}` case covers the default
+NON_TRACING_CASES = [
+    pytest.param({"fork_url": fork_url, "tracing": False}, marks=pytest.mark.fork),
+    pytest.param(
+        {"fork_url": fork_url, "tracing": False, "fork_block": "latest"},
+        marks=pytest.mark.fork,
+    ),
     {},
 ]
 
+# mulDiv() -> 64 * 8 / 2
+MUL_DIV_CALLDATA = encode_calldata(b"\xaa\x9a\x09\x12", 64, 8, 2)
+# mulDivRoundingUp() -> 64 * 8 / 3
+MUL_DIV_ROUNDING_UP_CALLDATA = encode_calldata(b"\x0a\xf8\xb2\x7f", 64, 8, 3)
+# deposit()
+DEPOSIT_CALLDATA = bytes.fromhex("d0e30db0")
+# balanceOf(address2)
+BALANCE_OF_CALLDATA = b"\x70\xa0\x82\x31" + encode_address(address2)
+# foo()
+FOO_CALLDATA = b"\xc2\x98Ux"
+# get_blobbasefee()
+GET_BLOBBASEFEE_CALLDATA = bytes.fromhex("5fb0146d")
+# log_blobhashes()
+LOG_BLOBHASHES_CALLDATA = bytes.fromhex("cc883ac4")
+# blob_hash.bin logs 6 blob hashes, zero for the ones the transaction does not carry
+LOGGED_BLOB_HASHES = 6 * [b"\0" * 32]
+BLOB_HASH_CASES = [2 * [b"1" * 32], 6 * [b"2" * 32]]
+# RETURNDATASIZE DUP2 PUSH1 0x0a RETURNDATASIZE CODECOPY RETURN, see test_blueprint
+DEPLOY_PREAMBLE_TAIL = bytes.fromhex("3d81600a3d39f3")
+# JUMPDEST PUSH0 JUMP, spins until the call runs out of gas
+SPIN_CODE = bytes.fromhex("5B5F56")
+
+
+@pytest.fixture(scope="module")
+def full_math_info():
+    return AccountInfo(code=load_contract_bin("full_math.bin"))
+
+
+@pytest.fixture(scope="module", params=NON_TRACING_CASES)
+def _full_math_evm(request, full_math_info):
+    # built once per kwargs case and shared by the tests below, see `full_math_evm`
+    evm = EVM(**request.param)
+    evm.insert_account_info(address, full_math_info)
+    return evm
+
+
+@pytest.fixture
+def full_math_evm(_full_math_evm):
+    checkpoint = _full_math_evm.snapshot()
+    yield _full_math_evm
+    _full_math_evm.revert(checkpoint)
+
+
+def test_preload_memory():
+    evm = EVM()
+    accounts = evm.db_accounts
+
+    # an in-memory database has nothing to fetch, so nothing gets cached either
+    evm.preload([address, address2])
+    assert evm.db_accounts.keys() == accounts.keys()
 
+
+@pytest.mark.fork
 def test_revm_fork():
     # set up an evm
     evm = EVM(
@@ -35,6 +91,12 @@ def test_revm_fork():
 
     assert evm.env.block.timestamp == 100
 
+    # fetch both accounts in one go instead of one round trip per lookup
+    evm.preload([address, address2])
+    # keys are checksummed, the test addresses are not all
+    preloaded = {key.lower() for key in evm.db_accounts}
+    assert {address.lower(), address2.lower()} <= preloaded
+
     vb_before = evm.basic(address)
     assert vb_before is not None
 
@@ -53,10 +115,10 @@ def test_revm_fork():
     assert info.balance == 10000
 
 
-def test_fork_storage():
+@pytest.mark.fork
+def test_fork_storage(forked_evm):
     weth = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-    evm = EVM(fork_url=fork_url, fork_block="latest")
-    value = evm.storage(weth, 0)
+    value = forked_evm.storage(weth, 0)
     assert value > 0
 
 
@@ -74,13 +136,13 @@ def test_deploy():
 
     assert deployed_at == "0x3e4ea2156166390f880071d94458efb098473311"
     deployed_code = evm.get_code(deployed_at)
-    assert deployed_code.hex().rstrip("0") in code.hex()
+    assert deployed_code.rstrip(b"\0") in code
     assert evm.basic(deployed_at).code.hex() == deployed_code.hex()
 
     result = evm.message_call(
         address,
         deployed_at,
-        calldata=b"\xc2\x98Ux",  # ==method_id('foo()')
+        calldata=FOO_CALLDATA,
     )
     assert int(result.hex(), 16) == 123
 
@@ -100,6 +162,7 @@ def test_balances():
     assert evm.basic(address).balance == amount
 
 
+@pytest.mark.fork
 def test_balances_fork():
     evm = EVM(
         fork_url=fork_url,
@@ -116,44 +179,129 @@ def test_balances_fork():
     assert evm.basic(address).balance == amount
 
 
-@pytest.mark.parametrize("kwargs", KWARG_CASES)
-def test_message_call(kwargs):
-    evm = EVM(**kwargs)
-    info = AccountInfo(code=load_contract_bin("full_math.bin"))
-    evm.insert_account_info(address, info)
-    assert evm.basic(address).code == info.code
+def test_message_call(full_math_evm, full_math_info):
+    assert full_math_evm.basic(address).code == full_math_info.code
 
     # mulDiv() -> 64 * 8 / 2
-    result = evm.message_call(
+    result = full_math_evm.message_call(
         caller=address2,
         to=address,
-        calldata=bytes.fromhex(
-            f"aa9a0912{encode_uint(64)}{encode_uint(8)}{encode_uint(2)}"
-        ),
+        calldata=MUL_DIV_CALLDATA,
     )
 
     assert int.from_bytes(result, "big") == 256
 
 
-@pytest.mark.parametrize("kwargs", KWARG_CASES)
-def test_call_committing(kwargs):
-    evm = EVM(**kwargs)
-    evm.insert_account_info(
-        address, AccountInfo(code=load_contract_bin("full_math.bin"))
-    )
-
+def test_call_committing(full_math_evm):
     # mulDivRoundingUp() -> 64 * 8 / 3
-    result = evm.message_call(
+    result = full_math_evm.message_call(
         caller=address2,
         to=address,
-        calldata=bytes.fromhex(
-            f"0af8b27f{encode_uint(64)}{encode_uint(8)}{encode_uint(3)}"
-        ),
+        calldata=MUL_DIV_ROUNDING_UP_CALLDATA,
     )
 
     assert int.from_bytes(result, "big") == 171
 
 
+def test_message_call_many(full_math_info):
+    evm = EVM()
+    evm.insert_account_info(address, full_math_info)
+
+    # mulDiv() -> 64 * 8 / 2, run 10 times without committing
+    elapsed_ns = evm.message_call_many(
+        10,
+        caller=address2,
+        to=address,
+        calldata=MUL_DIV_CALLDATA,
+    )
+
+    assert elapsed_ns > 0
+    assert evm.result.is_success
+
+
+def test_message_call_many_noop():
+    evm = EVM()
+    # PUSH0 PUSH0 POP POP
+    evm.insert_account_info(address, AccountInfo(code=bytes.fromhex("5F5F5050")))
+
+    assert evm.message_call_many(10, address2, address) > 0
+    assert evm.result.is_success
+    assert evm.result.gas_used == 21008
+
+
+def test_message_call_concurrent(full_math_info):
+    evms = [EVM() for _ in range(4)]
+    for evm in evms:
+        evm.insert_account_info(address, full_math_info)
+
+    def mul_div(evm):
+        # mulDiv() -> 64 * 8 / 2
+        return evm.message_call(
+            caller=address2,
+            to=address,
+            calldata=MUL_DIV_CALLDATA,
+        )
+
+    # separate EVMs called from several threads at once each get their own result
+    with ThreadPoolExecutor(max_workers=len(evms)) as executor:
+        results = list(executor.map(mul_div, evms))
+
+    assert [int.from_bytes(r, "big") for r in results] == [256] * len(evms)
+
+
+def test_message_call_releases_gil():
+    evm = EVM()
+    evm.insert_account_info(address, AccountInfo(code=SPIN_CODE))
+
+    ticks = []
+    done = threading.Event()
+
+    def tick():
+        while not done.is_set():
+            ticks.append(time.perf_counter())
+            time.sleep(0.001)
+
+    ticker = threading.Thread(target=tick)
+    ticker.start()
+    try:
+        start = time.perf_counter()
+        with pytest.raises(RuntimeError):
+            evm.message_call(caller=address2, to=address, gas=100_000_000)
+        end = time.perf_counter()
+    finally:
+        done.set()
+        ticker.join()
+
+    # while the GIL is held the ticker stalls for the whole call, so the longest gap
+    # between ticks would span it; with the GIL released it keeps ticking alongside
+    during = [start, *(t for t in ticks if start < t < end), end]
+    assert max(b - a for a, b in zip(during, during[1:])) < (end - start) / 2
+
+
+def test_message_call_shared_evm():
+    evm = EVM()
+    evm.insert_account_info(address, AccountInfo(code=SPIN_CODE))
+
+    def spin():
+        return evm.message_call(caller=address2, to=address, gas=100_000_000)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        spinning = executor.submit(spin)
+        # the EVM stays borrowed while its call runs, wait until the other thread holds it
+        while not spinning.done():
+            try:
+                evm.basic(address)
+            except RuntimeError:
+                break
+
+        # a second call on the same instance fails fast instead of waiting its turn
+        with pytest.raises(RuntimeError, match="Already (mutably )?borrowed"):
+            evm.message_call(caller=address2, to=address, gas=100_000)
+
+        with pytest.raises(RuntimeError, match="OutOfGas"):
+            spinning.result()
+
+
 def test_call_revert():
     evm = EVM()
     amount = 10000
@@ -172,7 +320,7 @@ def test_call_revert():
     assert evm.get_balance(address2) == amount
 
 
-@pytest.mark.parametrize("kwargs", KWARG_CASES)
+@pytest.mark.parametrize("kwargs", NON_TRACING_CASES)
 def test_call_empty_result(kwargs):
     evm = EVM(**kwargs)
     evm.insert_account_info(address, AccountInfo(code=load_contract_bin("weth_9.bin")))
@@ -183,7 +331,7 @@ def test_call_empty_result(kwargs):
         caller=address2,
         to=address,
         value=10000,
-        calldata=bytes.fromhex("d0e30db0"),
+        calldata=DEPOSIT_CALLDATA,
     )
 
     assert deposit == b""
@@ -191,7 +339,7 @@ def test_call_empty_result(kwargs):
     balance = evm.message_call(
         caller=address2,
         to=address,
-        calldata=bytes.fromhex("70a08231" + encode_address(address2)),
+        calldata=BALANCE_OF_CALLDATA,
     )
 
     assert int.from_bytes(balance, "big") == 10000
@@ -206,7 +354,7 @@ def test_tracing(capsys):
         caller=address2,
         to=address,
         value=10000,
-        calldata=bytes.fromhex("d0e30db0"),
+        calldata=DEPOSIT_CALLDATA,
     )
     assert evm.tracing
     captured = capsys.readouterr()
@@ -228,15 +376,13 @@ def test_blueprint():
     bytecode = load_contract_bin("blueprint.bin")
 
     bytecode = b"\xfe\x71\x00" + bytecode
-    bytecode_len = len(bytecode)
-    bytecode_len_hex = hex(bytecode_len)[2:].rjust(4, "0")
 
-    # prepend a quick deploy preamble
-    deploy_preamble = bytes.fromhex("61" + bytecode_len_hex + "3d81600a3d39f3")
+    # prepend a quick deploy preamble: PUSH2 <bytecode length>, then copy and return it
+    deploy_preamble = b"\x61" + len(bytecode).to_bytes(2, "big") + DEPLOY_PREAMBLE_TAIL
     deploy_bytecode = deploy_preamble + bytecode
 
     deployer_address = evm.deploy(address, deploy_bytecode)
-    assert evm.basic(deployer_address).code.hex().rstrip("0") in deploy_bytecode.hex()
+    assert evm.basic(deployer_address).code.rstrip(b"\0") in deploy_bytecode
 
 
 def test_block_setters():
@@ -263,24 +409,45 @@ def test_tx_setters():
     assert evm.env.tx.blob_hashes == [b"1" * 32]
 
 
+def test_account_info_code_buffer(full_math_info):
+    code = load_contract_bin("full_math.bin")
+    for buffer in (bytearray(code), memoryview(code)):
+        info = AccountInfo(code=buffer)
+        assert info.code == full_math_info.code
+        assert info.code_hash == full_math_info.code_hash
+
+
+def test_tx_data_list_deprecated():
+    with pytest.warns(DeprecationWarning):
+        tx_env = TxEnv(data=list(b"\x01\x02"))
+    assert tx_env.data == b"\x01\x02"
+    assert TxEnv(data=b"\x01\x02").data == b"\x01\x02"
+
+
+@pytest.fixture(scope="module")
+def blob_fee_evm():
+    # deployed once, each case only swaps the block env
+    evm = EVM()
+    deployer_address = evm.deploy(address, load_contract_bin("blob_base_fee.bin"))
+    return evm, deployer_address
+
+
 @pytest.mark.parametrize(
     "excess_blob_gas,expected_fee",
     [(0, 1), (10**3, 1), (2**24, 152), (2**26, 537070730)],
 )
-def test_get_blobbasefee(excess_blob_gas, expected_fee):
-    evm = EVM()
+def test_get_blobbasefee(blob_fee_evm, excess_blob_gas, expected_fee):
+    evm, deployer_address = blob_fee_evm
     evm.set_block_env(BlockEnv(excess_blob_gas=excess_blob_gas))
-    bytecode = load_contract_bin("blob_base_fee.bin")
-    deployer_address = evm.deploy(address, bytecode)
     blobbasefee = evm.message_call(
         caller=address,
         to=deployer_address,
-        calldata=bytes.fromhex("5fb0146d"),  # method_id("get_blobbasefee()")
+        calldata=GET_BLOBBASEFEE_CALLDATA,
     )
     assert int.from_bytes(blobbasefee, "big") == expected_fee
 
 
-@pytest.mark.parametrize("blob_hashes", [[b"1" * 32] * 2, [b"2" * 32] * 6])
+@pytest.mark.parametrize("blob_hashes", BLOB_HASH_CASES)
 def test_get_blobhashes(blob_hashes):
     evm = EVM()
     evm.set_tx_env(TxEnv(blob_hashes=blob_hashes))
@@ -289,16 +456,16 @@ def test_get_blobhashes(blob_hashes):
     evm.message_call(
         caller=address,
         to=deployer_address,
-        calldata=bytes.fromhex("cc883ac4"),  # method_id("log_blobhashes()")
+        calldata=LOG_BLOBHASHES_CALLDATA,
     )
     logged = [log.data[0][1] for log in evm.result.logs]
 
-    # the contract logs 6 blob hashes, so pad with 0s
-    assert logged == blob_hashes + [b"\0" * 32] * (6 - len(blob_hashes))
+    # the contract always logs the same number of blob hashes, so pad with 0s
+    padding = LOGGED_BLOB_HASHES[len(blob_hashes) :]
+    assert logged == blob_hashes + padding
 
 
-@pytest.mark.parametrize("kwargs", KWARG_CASES)
-def test_call_reverting(kwargs):
+def test_call_reverting():
     evm = EVM()
     code = load_contract_bin("min.bin")
     deploy_address = evm.deploy(address, code)
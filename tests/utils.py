@@ -1,20 +1,84 @@
+import binascii
+import functools
+import mmap
 import os
 
 ADDRESS = "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045"  # vitalik.eth
 
 
+FIXTURES_DIR = f"{os.path.dirname(__file__)}/fixtures"
+
+
+# the ASCII whitespace `bytes.fromhex` skips, which `a2b_hex` rejects
+_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+def _strip_whitespace(contents: mmap.mmap, start: int, end: int) -> tuple[int, int]:
+    while start < end and contents[start] in _WHITESPACE:
+        start += 1
+    while end > start and contents[end - 1] in _WHITESPACE:
+        end -= 1
+    return start, end
+
+
+def _decode_hex_fixture(path: str) -> bytes:
+    # fixtures hold the hex encoded bytecode on the first line, optionally followed by the source
+    with open(path, "rb") as readfile:
+        # an empty file cannot be mapped
+        if os.fstat(readfile.fileno()).st_size == 0:
+            return b""
+        with mmap.mmap(
+            readfile.fileno(), 0, access=mmap.ACCESS_READ
+        ) as contents, memoryview(contents) as view:
+            end = contents.find(b"\n")
+            start, end = _strip_whitespace(
+                contents, 0, end if end != -1 else len(contents)
+            )
+            return binascii.a2b_hex(view[start:end])
+
+
+def _raw_fixture_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".rawbin"
+
+
+def _is_up_to_date(raw_path: str, path: str) -> bool:
+    if not os.path.exists(raw_path):
+        return False
+    return os.path.getmtime(raw_path) >= os.path.getmtime(path)
+
+
+def write_raw_fixture(contract_name: str) -> None:
+    """Decode a hex fixture once into a sibling `.rawbin` file, unless it is up to date."""
+    path = f"{FIXTURES_DIR}/{contract_name}"
+    raw_path = _raw_fixture_path(path)
+    if _is_up_to_date(raw_path, path):
+        return
+    # write to a temporary file first, so concurrent sessions never read a partial file
+    tmp_path = f"{raw_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as writefile:
+        writefile.write(_decode_hex_fixture(path))
+    os.replace(tmp_path, raw_path)
+
+
+@functools.lru_cache(maxsize=None)
 def load_contract_bin(contract_name: str) -> bytes:
-    with open(
-            f"{os.path.dirname(__file__)}/fixtures/{contract_name}", "r"
-    ) as readfile:
-        hexstring = readfile.readline()
-    return bytes.fromhex(hexstring)
+    path = f"{FIXTURES_DIR}/{contract_name}"
+    raw_path = _raw_fixture_path(path)
+    if _is_up_to_date(raw_path, path):
+        with open(raw_path, "rb") as readfile:
+            return readfile.read()
+    return _decode_hex_fixture(path)
+
+
+def encode_uint(num: int) -> bytes:
+    # also rejects values that do not fit in a uint256
+    return num.to_bytes(32, "big")
 
 
-def encode_uint(num: int) -> str:
-    encoded = hex(num)[2:]
-    return ("0" * (64 - len(encoded))) + encoded
+def encode_address(address: str) -> bytes:
+    # addresses are 20 bytes, left padded to a 32 byte word
+    return bytes.fromhex(format(address[2:], "0>64"))
 
 
-def encode_address(address: str) -> str:
-    return f'{"0" * 24}{address[2:]}'
+def encode_calldata(selector: bytes, *uints: int) -> bytes:
+    return selector + b"".join(encode_uint(num) for num in uints)